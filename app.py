@@ -1,21 +1,36 @@
+import atexit
+import hashlib
+import io
 import os
+import queue
+import re
+import sys
+import threading
 import time
 import mimetypes
-from dataclasses import dataclass
-from typing import Optional
+from dataclasses import dataclass, replace
+from typing import Iterator, Optional
 from urllib.parse import quote
+from functools import lru_cache
 from pathlib import Path
 
+import orjson
 import requests
-from dotenv import load_dotenv
-from flask import Flask, Response, abort, request
+from cachetools import LRUCache
+from dotenv import find_dotenv, load_dotenv
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from flask import Flask, Response, abort, request, send_file, stream_with_context
 from flask_cors import CORS
+from werkzeug.security import safe_join
 
 _here = Path(__file__).resolve().parent
-# Prefer loading `flask_server/.env` regardless of current working directory.
-load_dotenv(dotenv_path=_here / ".env")
-# Fallback to default discovery (useful if user keeps .env at repo root).
-load_dotenv()
+# Prefer loading `flask_server/.env` regardless of current working directory;
+# fall back to default discovery (useful if user keeps .env at repo root).
+if (_here / ".env").is_file():
+    load_dotenv(dotenv_path=_here / ".env")
+else:
+    load_dotenv(find_dotenv())
 
 app = Flask(__name__)
 CORS(app, resources={r"/*": {"origins": "*"}})
@@ -27,77 +42,84 @@ SUPABASE_SERVICE_ROLE_KEY = os.getenv("SUPABASE_SERVICE_ROLE_KEY") or ""
 
 FLASK_HOST = os.getenv("FLASK_HOST") or "127.0.0.1"
 FLASK_PORT = int(os.getenv("FLASK_PORT") or "5000")
-FLASK_DEBUG = (os.getenv("FLASK_DEBUG") or "").strip() in {"1", "true", "True", "yes", "YES"}
+FLASK_DEBUG = os.getenv("FLASK_DEBUG", "").strip().lower() in {"1", "true", "yes"}
 
 HTML_CACHE_TTL_SECONDS = int(os.getenv("HTML_CACHE_TTL_SECONDS") or os.getenv("CACHE_TTL_SECONDS") or "30")
 STATIC_CACHE_TTL_SECONDS = int(os.getenv("STATIC_CACHE_TTL_SECONDS") or "86400")
 LOCAL_FALLBACK_DIR = os.getenv("LOCAL_FALLBACK_DIR")  # optional
+if LOCAL_FALLBACK_DIR:
+    # Resolve against cwd once; send_file would otherwise resolve relative paths against app.root_path.
+    LOCAL_FALLBACK_DIR = os.path.abspath(LOCAL_FALLBACK_DIR)
+
+# In-memory asset cache budget (bytes). Assets bigger than the per-item
+# limit are never cached so one huge file can't evict everything else.
+CACHE_MAX_BYTES = int(os.getenv("CACHE_MAX_BYTES") or str(64 * 1024 * 1024))
+CACHE_MAX_ITEM_BYTES = min(int(os.getenv("CACHE_MAX_ITEM_BYTES") or "2000000"), CACHE_MAX_BYTES)
+
+# Pageviews are queued and inserted in batches by a background thread.
+PAGEVIEW_BATCH_SIZE = int(os.getenv("PAGEVIEW_BATCH_SIZE") or "200")
+PAGEVIEW_BATCH_MAX_WAIT_MS = int(os.getenv("PAGEVIEW_BATCH_MAX_WAIT_MS") or "50")
+
+# One pooled session for every Supabase call: keep-alive reuses the TCP+TLS connection
+# instead of paying a fresh handshake per request.
+_http = requests.Session()
+_http.mount(
+    "https://",
+    HTTPAdapter(pool_connections=50, pool_maxsize=50, max_retries=Retry(total=3, backoff_factor=0.1)),
+)
+
+
+# Cache policy by file extension: (server cache TTL seconds, browser cache-control).
+# Static assets: cache aggressively so refreshes are consistently fast.
+_STATIC_EXTS = frozenset({
+    "css",
+    "js",
+    "mjs",
+    "png",
+    "jpg",
+    "jpeg",
+    "gif",
+    "webp",
+    "svg",
+    "ico",
+    "woff",
+    "woff2",
+    "ttf",
+    "otf",
+    "eot",
+    "map",
+})
+# HTML is always revalidated by the browser (cheap thanks to ETag/304) so deploys show up at once.
+_HTML_EXTS = frozenset({"html", "htm"})
+# JSON config might change; keep shorter (same as unknown types).
+_JSON_EXTS = frozenset({"json"})
+
+_SHORT_TTL_SECONDS = min(HTML_CACHE_TTL_SECONDS, 300)
+_DEFAULT_POLICY = (_SHORT_TTL_SECONDS, f"public, max-age={_SHORT_TTL_SECONDS}")
+_POLICY_BY_EXT: dict[str, tuple[int, str]] = {
+    **{ext: (STATIC_CACHE_TTL_SECONDS, f"public, max-age={STATIC_CACHE_TTL_SECONDS}, immutable") for ext in _STATIC_EXTS},
+    **{ext: (HTML_CACHE_TTL_SECONDS, "no-cache") for ext in _HTML_EXTS},
+    **{ext: _DEFAULT_POLICY for ext in _JSON_EXTS},
+}
+
+
+def _policy_for_path(path: str) -> tuple[int, str]:
+    _, dot, ext = (path or "").rpartition(".")
+    if not dot:
+        return _DEFAULT_POLICY
+    return _POLICY_BY_EXT.get(ext.lower(), _DEFAULT_POLICY)
 
 
 def _cache_control_for_path(path: str) -> str:
-    p = (path or "").lower()
-    # HTML should stay relatively fresh during development.
-    if p.endswith(".html") or p.endswith(".htm"):
-        return f"public, max-age={HTML_CACHE_TTL_SECONDS}"
-
-    # JSON config might change; keep shorter.
-    if p.endswith(".json"):
-        return f"public, max-age={min(HTML_CACHE_TTL_SECONDS, 300)}"
-
-    # Static assets: cache aggressively so refreshes are consistently fast.
-    if p.endswith((
-        ".css",
-        ".js",
-        ".mjs",
-        ".png",
-        ".jpg",
-        ".jpeg",
-        ".gif",
-        ".webp",
-        ".svg",
-        ".ico",
-        ".woff",
-        ".woff2",
-        ".ttf",
-        ".otf",
-        ".eot",
-        ".map",
-    )):
-        return f"public, max-age={STATIC_CACHE_TTL_SECONDS}, immutable"
-
-    return f"public, max-age={min(HTML_CACHE_TTL_SECONDS, 300)}"
+    return _policy_for_path(path)[1]
 
 
 def _ttl_seconds_for_path(path: str) -> int:
-    p = (path or "").lower()
-    if p.endswith((".html", ".htm")):
-        return HTML_CACHE_TTL_SECONDS
-    if p.endswith(".json"):
-        return min(HTML_CACHE_TTL_SECONDS, 300)
-    if p.endswith((
-        ".css",
-        ".js",
-        ".mjs",
-        ".png",
-        ".jpg",
-        ".jpeg",
-        ".gif",
-        ".webp",
-        ".svg",
-        ".ico",
-        ".woff",
-        ".woff2",
-        ".ttf",
-        ".otf",
-        ".eot",
-        ".map",
-    )):
-        return STATIC_CACHE_TTL_SECONDS
-    return min(HTML_CACHE_TTL_SECONDS, 300)
-
-
-def _supabase_rest_insert(*, table: str, payload: dict) -> bool:
-    """Insert a single row into a Supabase Postgres table via PostgREST.
+    return _policy_for_path(path)[0]
+
+
+def _supabase_rest_insert(*, table: str, payload: dict | list[dict]) -> bool:
+    """Insert a row (or a list of rows, as one bulk insert) into a Supabase Postgres table via PostgREST.
 
     Uses the service role key from the server environment (never exposed to the browser).
     """
@@ -114,14 +136,14 @@ def _supabase_rest_insert(*, table: str, payload: dict) -> bool:
     }
 
     try:
-        resp = requests.post(url, headers=headers, json=payload, timeout=8)
+        resp = _http.post(url, headers=headers, data=orjson.dumps(payload), timeout=8)
     except requests.RequestException:
         return False
 
     return 200 <= resp.status_code < 300
 
 
-def _supabase_rest_insert_debug(*, table: str, payload: dict) -> tuple[bool, int, str]:
+def _supabase_rest_insert_debug(*, table: str, payload: dict | list[dict]) -> tuple[bool, int, str]:
     """Same insert as _supabase_rest_insert, but returns details for debugging."""
 
     if not SUPABASE_URL or not SUPABASE_SERVICE_ROLE_KEY:
@@ -136,7 +158,7 @@ def _supabase_rest_insert_debug(*, table: str, payload: dict) -> tuple[bool, int
     }
 
     try:
-        resp = requests.post(url, headers=headers, json=payload, timeout=8)
+        resp = _http.post(url, headers=headers, data=orjson.dumps(payload), timeout=8)
     except requests.RequestException as e:
         return (False, 0, f"Request failed: {type(e).__name__}")
 
@@ -145,64 +167,154 @@ def _supabase_rest_insert_debug(*, table: str, payload: dict) -> tuple[bool, int
     return (ok, resp.status_code, msg)
 
 
-def _read_json_body_safely() -> dict:
-    data = request.get_json(silent=True)
-    if isinstance(data, dict):
-        return data
+_pv_queue: "queue.Queue[dict]" = queue.Queue(maxsize=10000)
+_pv_flusher: Optional[threading.Thread] = None
+_pv_flusher_lock = threading.Lock()
+
+
+def _next_pageview_batch() -> list[dict]:
+    """Block for one pageview, then collect more until the batch is full or max wait elapses."""
+
+    batch = [_pv_queue.get()]
+    deadline = time.monotonic() + PAGEVIEW_BATCH_MAX_WAIT_MS / 1000
+    while len(batch) < PAGEVIEW_BATCH_SIZE:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        try:
+            batch.append(_pv_queue.get(timeout=remaining))
+        except queue.Empty:
+            break
+    return batch
+
+
+def _insert_pageviews(rows: list[dict]) -> None:
+    ok, status, msg = _supabase_rest_insert_debug(table="acfh_page_views", payload=rows)
+    if ok:
+        return
+
+    if 400 <= status < 500 and len(rows) > 1:
+        # One rejected row fails the whole bulk insert; split so the good rows still land.
+        mid = len(rows) // 2
+        _insert_pageviews(rows[:mid])
+        _insert_pageviews(rows[mid:])
+        return
+
+    app.logger.warning("Pageview insert rejected (%d rows dropped): %s", len(rows), msg)
+
+
+def _pageview_flusher() -> None:
+    while True:
+        batch = _next_pageview_batch()
+        try:
+            _insert_pageviews(batch)
+        except Exception:
+            # Never let one bad batch kill the thread (the queue would fill and drop everything).
+            app.logger.exception("Pageview batch insert failed (%d rows dropped)", len(batch))
+
+
+def _enqueue_pageview(payload: dict) -> bool:
+    """Queue a pageview for the background flusher. Returns False if it was dropped."""
+
+    global _pv_flusher
+
+    if not SUPABASE_URL or not SUPABASE_SERVICE_ROLE_KEY:
+        return False
+
+    # Start lazily so each gunicorn worker gets its own thread (threads don't survive fork).
+    if _pv_flusher is None or not _pv_flusher.is_alive():
+        with _pv_flusher_lock:
+            if _pv_flusher is None or not _pv_flusher.is_alive():
+                _pv_flusher = threading.Thread(target=_pageview_flusher, name="pageview-flusher", daemon=True)
+                _pv_flusher.start()
+
+    try:
+        _pv_queue.put_nowait(payload)
+    except queue.Full:
+        return False
+    return True
 
-    raw = request.get_data(cache=False, as_text=True) or ""
-    raw = raw.strip()
+
+@atexit.register
+def _flush_pageviews_on_exit() -> None:
+    rows: list[dict] = []
+    while True:
+        try:
+            rows.append(_pv_queue.get_nowait())
+        except queue.Empty:
+            break
+    if rows:
+        _insert_pageviews(rows)
+
+
+def _read_json_body_safely() -> dict:
+    # Single read + single parse of the raw bytes, whatever the Content-Type.
+    raw = request.get_data(cache=False)
     if not raw:
         return {}
 
     try:
-        import json
-
-        parsed = json.loads(raw)
-        return parsed if isinstance(parsed, dict) else {}
+        data = orjson.loads(raw)
     except Exception:
         return {}
+    return data if isinstance(data, dict) else {}
+
+
+# One regex scan per User-Agent; the coarse name is then picked by priority from the tokens found.
+_UA_PLATFORM_RE = re.compile(r"windows|android|iphone|ipad|ios|mac os x|macintosh|linux", re.I | re.A)
+_UA_PLATFORM_BY_TOKEN = {
+    "windows": "Windows",
+    "android": "Android",
+    "iphone": "iOS",
+    "ipad": "iOS",
+    "ios": "iOS",
+    "mac os x": "macOS",
+    "macintosh": "macOS",
+    "linux": "Linux",
+}
+_UA_PLATFORM_PRIORITY = ("Windows", "Android", "iOS", "macOS", "Linux")
+# Known Sec-CH-UA-Platform values, so every request reports the same shared string object.
+_CH_PLATFORMS = {p: sys.intern(p) for p in (*_UA_PLATFORM_PRIORITY, "Chrome OS", "Chromium OS", "Fuchsia", "Unknown")}
+_UA_BROWSER_RE = re.compile(r"edg/|opr/|opera|firefox/|chrome/|safari/", re.I | re.A)
 
 
 def _coarse_platform_from_headers() -> str:
     # Prefer Client Hints if present.
     ch = (request.headers.get("Sec-CH-UA-Platform") or "").strip().strip('"')
     if ch:
-        return ch[:32]
+        return _CH_PLATFORMS.get(ch) or ch[:32]
 
     ua = request.headers.get("User-Agent") or ""
-    ua_l = ua.lower()
-    if "windows" in ua_l:
-        return "Windows"
-    if "android" in ua_l:
-        return "Android"
-    if "iphone" in ua_l or "ipad" in ua_l or "ios" in ua_l:
-        return "iOS"
-    if "mac os x" in ua_l or "macintosh" in ua_l:
-        return "macOS"
-    if "linux" in ua_l:
-        return "Linux"
+    found = {_UA_PLATFORM_BY_TOKEN[t.lower()] for t in _UA_PLATFORM_RE.findall(ua)}
+    for platform in _UA_PLATFORM_PRIORITY:
+        if platform in found:
+            return platform
     return "Other"
 
 
 def _coarse_browser_from_headers() -> str:
     ua = request.headers.get("User-Agent") or ""
-    ua_l = ua.lower()
+    found = {t.lower() for t in _UA_BROWSER_RE.findall(ua)}
 
     # Order matters.
-    if "edg/" in ua_l:
+    if "edg/" in found:
         return "Edge"
-    if "opr/" in ua_l or "opera" in ua_l:
+    if "opr/" in found or "opera" in found:
         return "Opera"
-    if "firefox/" in ua_l:
+    if "firefox/" in found:
         return "Firefox"
-    if "chrome/" in ua_l and "safari/" in ua_l and "edg/" not in ua_l:
+    if "chrome/" in found and "safari/" in found:
         return "Chrome"
-    if "safari/" in ua_l and "chrome/" not in ua_l:
+    if "safari/" in found:
         return "Safari"
     return "Other"
 
 
+def _clean_text(value) -> str:
+    # Postgres text columns reject NUL, and one rejected row fails a whole batch insert.
+    return str(value or "").replace("\x00", "").strip()
+
+
 @app.route("/track/pageview", methods=["POST", "GET"])
 def track_pageview():
     """Anonymous pageview counter.
@@ -212,14 +324,14 @@ def track_pageview():
     """
 
     if request.method == "GET":
-        page = (request.args.get("page") or "").strip()
-        source = (request.args.get("source") or "").strip() or "web"
-        client_id = (request.args.get("cid") or "").strip() or None
+        page = _clean_text(request.args.get("page"))
+        source = _clean_text(request.args.get("source")) or "web"
+        client_id = _clean_text(request.args.get("cid")) or None
     else:
         data = _read_json_body_safely()
-        page = str(data.get("page") or "").strip()
-        source = str(data.get("source") or "").strip() or "web"
-        client_id = str(data.get("cid") or "").strip() or None
+        page = _clean_text(data.get("page"))
+        source = _clean_text(data.get("source")) or "web"
+        client_id = _clean_text(data.get("cid")) or None
 
     if not page or len(page) > 64:
         abort(400)
@@ -247,7 +359,7 @@ def track_pageview():
 
     if debug:
         ok, status, msg = _supabase_rest_insert_debug(table="acfh_page_views", payload=payload)
-        return {
+        body = {
             "ok": ok,
             "status": status,
             "message": msg,
@@ -259,12 +371,11 @@ def track_pageview():
                 "client_id": bool(client_id),
             },
         }
+        return Response(orjson.dumps(body), mimetype="application/json")
 
-    ok = _supabase_rest_insert(table="acfh_page_views", payload=payload)
-    if not ok:
-        # If Supabase isn't configured, don't break the UI.
-        return ("", 204)
-
+    # Inserted in the background; if Supabase isn't configured (or the queue is full),
+    # the pageview is dropped without breaking the UI.
+    _enqueue_pageview(payload)
     return ("", 204)
 
 
@@ -272,10 +383,32 @@ def track_pageview():
 class CacheItem:
     content: bytes
     content_type: str
+    etag: str
     expires_at: float
+    # Validators from Supabase, used to revalidate the entry once it expires.
+    upstream_etag: Optional[str] = None
+    upstream_last_modified: Optional[str] = None
+
+
+def _make_cache_item(path: str, content: bytes, content_type: str, upstream: requests.Response) -> CacheItem:
+    return CacheItem(
+        content=content,
+        content_type=content_type,
+        etag=hashlib.blake2b(content, digest_size=16).hexdigest(),
+        expires_at=time.monotonic() + _ttl_seconds_for_path(path),
+        upstream_etag=upstream.headers.get("etag"),
+        upstream_last_modified=upstream.headers.get("last-modified"),
+    )
+
+
+def _cache_item_size(item: CacheItem) -> int:
+    return len(item.content)
 
 
-_cache: dict[str, CacheItem] = {}
+# Byte-capped LRU. Expired entries are kept (until evicted) so they can be revalidated
+# upstream with a conditional GET instead of re-downloading the body.
+_cache: LRUCache = LRUCache(maxsize=CACHE_MAX_BYTES, getsizeof=_cache_item_size)
+_cache_lock = threading.Lock()
 
 
 def _guess_content_type(path: str, fallback: str = "application/octet-stream") -> str:
@@ -283,28 +416,50 @@ def _guess_content_type(path: str, fallback: str = "application/octet-stream") -
     return guessed or fallback
 
 
+@lru_cache(maxsize=1024)
 def _supabase_object_public_url(path: str) -> str:
+    # Pure function of path (SUPABASE_URL/SUPABASE_BUCKET are fixed at import), so memoize it.
     # Keep slashes while encoding other characters.
     encoded = quote(path, safe="/")
     return f"{SUPABASE_URL}/storage/v1/object/public/{SUPABASE_BUCKET}/{encoded}"
 
 
-def _fetch_from_supabase(path: str) -> Optional[Response]:
+def _fetch_streaming(path: str, cached: Optional[CacheItem] = None) -> Optional[requests.Response]:
+    """Open the object on Supabase Storage without reading its body.
+
+    Returns the open upstream response (caller must close it), or None if the object
+    is not available so callers can fall back to local. When `cached` carries upstream
+    validators the request is conditional and may come back as a 304.
+    """
+
     if not SUPABASE_URL:
         return None
 
     url = _supabase_object_public_url(path)
-    headers_with_auth: dict[str, str] = {}
+    conditional: dict[str, str] = {}
+    if cached is not None:
+        if cached.upstream_etag:
+            conditional["If-None-Match"] = cached.upstream_etag
+        if cached.upstream_last_modified:
+            conditional["If-Modified-Since"] = cached.upstream_last_modified
+
+    headers_with_auth = dict(conditional)
     if SUPABASE_ANON_KEY:
         headers_with_auth["apikey"] = SUPABASE_ANON_KEY
         headers_with_auth["Authorization"] = f"Bearer {SUPABASE_ANON_KEY}"
 
     # Public buckets do not require auth headers. In some setups, sending an invalid/mismatched
     # JWT can cause a 400/401/403 and break local rendering. To be robust, retry without auth.
-    upstream = requests.get(url, headers=headers_with_auth or None, timeout=30)
-    if upstream.status_code in {400, 401, 403} and headers_with_auth:
+    upstream = _http.get(url, headers=headers_with_auth or None, timeout=30, stream=True)
+    if upstream.status_code in {400, 401, 403} and SUPABASE_ANON_KEY:
         # Retry without auth headers (public buckets do not need JWT headers).
-        upstream = requests.get(url, timeout=30)
+        upstream.close()
+        upstream = _http.get(url, headers=conditional or None, timeout=30, stream=True)
+
+    if upstream.status_code < 400:
+        return upstream
+
+    upstream.close()
 
     if upstream.status_code == 404:
         return None
@@ -314,13 +469,61 @@ def _fetch_from_supabase(path: str) -> Optional[Response]:
         # This is especially important for /bootstrap.js.
         return None
 
-    if upstream.status_code >= 400:
-        abort(upstream.status_code)
+    abort(upstream.status_code)
 
-    content = upstream.content
-    content_type = upstream.headers.get("content-type") or _guess_content_type(path)
 
-    return Response(content, status=200, content_type=content_type)
+def _read_upstream(upstream: requests.Response) -> bytes:
+    # Read the body in chunks so large assets don't need one huge intermediate buffer.
+    try:
+        buf = io.BytesIO()
+        for chunk in upstream.iter_content(65536):
+            buf.write(chunk)
+        return buf.getvalue()
+    finally:
+        upstream.close()
+
+
+def _stream_upstream(upstream: requests.Response, prefix: bytes = b"", chunks: Optional[Iterator[bytes]] = None):
+    # `prefix`/`chunks` let a caller that already read part of the body hand over the rest.
+    try:
+        if prefix:
+            yield prefix
+        yield from (chunks if chunks is not None else upstream.iter_content(65536))
+    finally:
+        upstream.close()
+
+
+def _read_upstream_up_to(upstream: requests.Response, limit: int) -> tuple[bytes, Optional[Iterator[bytes]]]:
+    """Read at most about `limit` bytes of the body.
+
+    Returns (body, None) with the connection closed if the whole body fit, otherwise
+    (prefix read so far, iterator over the remaining chunks) with the connection still open.
+    """
+
+    chunks = upstream.iter_content(65536)
+    buf = io.BytesIO()
+    try:
+        for chunk in chunks:
+            buf.write(chunk)
+            if buf.tell() > limit:
+                return buf.getvalue(), chunks
+    except BaseException:
+        upstream.close()
+        raise
+
+    upstream.close()
+    return buf.getvalue(), None
+
+
+def _fetch_for_cache(path: str) -> Optional[Response]:
+    """Fetch an object from Supabase Storage fully into memory."""
+
+    upstream = _fetch_streaming(path)
+    if upstream is None:
+        return None
+
+    content_type = upstream.headers.get("content-type") or _guess_content_type(path)
+    return Response(_read_upstream(upstream), status=200, content_type=content_type)
 
 
 def _fetch_from_local(path: str) -> Optional[Response]:
@@ -328,20 +531,23 @@ def _fetch_from_local(path: str) -> Optional[Response]:
         return None
 
     # Prevent path traversal
-    safe_path = path.replace("..", "")
-    full_path = os.path.join(LOCAL_FALLBACK_DIR, safe_path)
-    if not os.path.isfile(full_path):
+    full_path = safe_join(LOCAL_FALLBACK_DIR, path)
+    if full_path is None or not os.path.isfile(full_path):
         return None
 
-    with open(full_path, "rb") as f:
-        content = f.read()
+    # Served straight from disk (the OS page cache already keeps hot files in memory), with
+    # sendfile where the server supports it and 304s for conditional requests.
+    return send_file(full_path, mimetype=_guess_content_type(path), conditional=True)
+
 
-    return Response(content, status=200, content_type=_guess_content_type(path))
+# Pre-serialized once. A fresh Response per probe is still needed because after_request
+# hooks (CORS) mutate headers, but the body bytes are shared.
+_HEALTH_BODY = b'{"ok":true}'
 
 
 @app.get("/health")
 def health():
-    return {"ok": True}
+    return Response(_HEALTH_BODY, status=200, mimetype="application/json", headers={"Cache-Control": "no-store"})
 
 
 @app.get("/bootstrap.js")
@@ -354,7 +560,7 @@ def bootstrap_js():
     """
 
     # Allow remote override from Supabase
-    remote = _fetch_from_supabase("bootstrap.js")
+    remote = _fetch_for_cache("bootstrap.js")
     if remote is not None:
         remote.headers["cache-control"] = "no-store"
         return remote
@@ -367,60 +573,90 @@ def bootstrap_js():
     return Response(content, status=200, content_type="application/javascript")
 
 
-@app.get("/site/<path:asset_path>")
+def _streamed_response(asset_path: str, content_type: str, body: Iterator[bytes]) -> Response:
+    out = Response(stream_with_context(body), status=200, content_type=content_type)
+    out.headers["cache-control"] = _cache_control_for_path(asset_path)
+    return out
+
+
+def _cached_response(asset_path: str, item: CacheItem) -> Response:
+    # Conditional GET: if the browser already has this exact content, skip the body.
+    if request.if_none_match.contains_weak(item.etag):
+        resp = Response(status=304)
+    else:
+        resp = Response(item.content, status=200, content_type=item.content_type)
+
+    resp.set_etag(item.etag)
+    resp.headers["cache-control"] = _cache_control_for_path(asset_path)
+    return resp
+
+
+# Root paths that belong to dedicated routes and must not be served as assets.
+_ROOT_SHADOWED = frozenset({"health", "bootstrap.js"})
+
+
 def site(asset_path: str):
     """Proxy any asset from Supabase Storage (or optional local fallback).
 
     The asset_path is used as-is as the object key in the bucket.
     Example: /site/options.html -> key "options.html".
-    """
 
-    # Simple cache
-    now = time.time()
-    cached = _cache.get(asset_path)
-    if cached and cached.expires_at > now:
-        resp = Response(cached.content, status=200, content_type=cached.content_type)
-        resp.headers["cache-control"] = _cache_control_for_path(asset_path)
-        return resp
+    Also registered at the root path (endpoint "site_root") to support assets referenced
+    with absolute paths like:
+        - /images/logo.png
+        - /lib/codemirror/codemirror.css
 
-    resp = _fetch_from_supabase(asset_path)
-    if resp is None:
-        resp = _fetch_from_local(asset_path)
+    This is especially important for CSS `url(/...)` which the JS loader does not rewrite.
+    """
 
-    if resp is None:
+    # Avoid shadowing known endpoints (these are handled by dedicated routes).
+    if request.endpoint == "site_root" and (asset_path in _ROOT_SHADOWED or asset_path.startswith("site/")):
         abort(404)
 
-    # Materialize for caching (small/medium assets). If you store huge files, revisit.
-    content_bytes = resp.get_data()
-    content_type = resp.content_type or _guess_content_type(asset_path)
-
-    _cache[asset_path] = CacheItem(
-        content=content_bytes,
-        content_type=content_type,
-        expires_at=now + _ttl_seconds_for_path(asset_path),
-    )
-
-    out = Response(content_bytes, status=200, content_type=content_type)
-    out.headers["cache-control"] = _cache_control_for_path(asset_path)
-    return out
-
+    with _cache_lock:
+        cached = _cache.get(asset_path)
+    if cached is not None and cached.expires_at > time.monotonic():
+        return _cached_response(asset_path, cached)
+
+    upstream = _fetch_streaming(asset_path, cached)
+    if upstream is not None and upstream.status_code == 304 and cached is not None:
+        # Unchanged upstream: keep the cached bytes, just extend their freshness.
+        upstream.close()
+        item = replace(cached, expires_at=time.monotonic() + _ttl_seconds_for_path(asset_path))
+        with _cache_lock:
+            _cache[asset_path] = item
+        return _cached_response(asset_path, item)
+
+    if upstream is not None:
+        content_type = upstream.headers.get("content-type") or _guess_content_type(asset_path)
+        content_length = upstream.headers.get("content-length")
+        if content_length is not None and content_length.isdigit() and int(content_length) > CACHE_MAX_ITEM_BYTES:
+            # Too big to cache: pipe upstream chunks straight to the client.
+            return _streamed_response(asset_path, content_type, _stream_upstream(upstream))
+
+        # Unknown size (e.g. chunked/compressed upstream) or small: read up to the cache limit.
+        content_bytes, rest = _read_upstream_up_to(upstream, CACHE_MAX_ITEM_BYTES)
+        if rest is not None:
+            return _streamed_response(asset_path, content_type, _stream_upstream(upstream, content_bytes, rest))
+
+        item = _make_cache_item(asset_path, content_bytes, content_type, upstream)
+    else:
+        resp = _fetch_from_local(asset_path)
+        if resp is None:
+            abort(404)
 
-@app.get("/<path:asset_path>")
-def site_root(asset_path: str):
-        """Serve assets from Supabase also at the root path.
+        resp.headers["cache-control"] = _cache_control_for_path(asset_path)
+        return resp
 
-        This exists to support assets referenced with absolute paths like:
-            - /images/logo.png
-            - /lib/codemirror/codemirror.css
+    if len(item.content) <= CACHE_MAX_ITEM_BYTES:
+        with _cache_lock:
+            _cache[asset_path] = item
 
-        It is especially important for CSS `url(/...)` which the JS loader does not rewrite.
-        """
+    return _cached_response(asset_path, item)
 
-        # Avoid shadowing known endpoints (these are handled by dedicated routes).
-        if asset_path in {"health", "bootstrap.js"} or asset_path.startswith("site/"):
-                abort(404)
 
-        return site(asset_path)
+app.add_url_rule("/site/<path:asset_path>", view_func=site, methods=["GET"])
+app.add_url_rule("/<path:asset_path>", endpoint="site_root", view_func=site, methods=["GET"])
 
 
 if __name__ == "__main__":
@@ -0,0 +1,21 @@
+"""Gunicorn settings for production (Render, etc.).
+
+Gunicorn picks this file up automatically when started from this folder:
+
+    gunicorn app:app
+
+`python app.py` still runs the Flask dev server for local work.
+"""
+
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT') or '5000'}"
+# Each worker holds its own asset cache, connection pool and pageview flusher, so keep the
+# default small (CPUs usable by this process, at most 2); raise it with WEB_CONCURRENCY.
+_cpu_count = getattr(os, "process_cpu_count", os.cpu_count)
+workers = int(os.getenv("WEB_CONCURRENCY") or min(_cpu_count() or 1, 2))
+
+# Requests mostly wait on Supabase, so let each worker overlap many of those waits on
+# threads instead of blocking a whole process per in-flight request.
+worker_class = "gthread"
+threads = int(os.getenv("GUNICORN_THREADS") or "8")
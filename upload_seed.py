@@ -1,11 +1,15 @@
 import argparse
+import hashlib
 import mimetypes
+import mmap
 import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 from urllib.parse import quote
 
 import requests
 from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
 
 
 def _env(name: str, default: str | None = None) -> str:
@@ -15,8 +19,27 @@ def _env(name: str, default: str | None = None) -> str:
     return value
 
 
+# Below this size a single read() is cheapest; above it the file is mmap'ed and handed to
+# the HTTP client as one buffer (a memoryview), so there is no per-chunk read() loop and no
+# in-memory copy of the file.
+_MMAP_THRESHOLD_BYTES = 256 * 1024
+
+
+def _file_md5(file_path: Path) -> str:
+    digest = hashlib.md5()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _normalize_content_type(value: str) -> str:
+    return value.replace(" ", "").lower()
+
+
 def _put_object(
     *,
+    session: requests.Session,
     supabase_url: str,
     bucket: str,
     object_key: str,
@@ -24,7 +47,9 @@ def _put_object(
     token: str,
     upsert: bool,
     timeout_s: int,
-):
+) -> bool:
+    """Upload one file. Returns False if it was skipped because the stored object is identical."""
+
     # Some Windows setups map .html to text/plain via registry.
     # Force common web types for better behavior when files are accessed directly.
     suffix = file_path.suffix.lower()
@@ -44,22 +69,55 @@ def _put_object(
             content_type = "application/octet-stream"
 
     encoded_key = quote(object_key.replace("\\", "/"), safe="/")
-    url = f"{supabase_url}/storage/v1/object/{bucket}/{encoded_key}"
+    object_url = f"{supabase_url}/storage/v1/object/{bucket}/{encoded_key}"
+    auth_headers = {
+        "apikey": token,
+        "Authorization": f"Bearer {token}",
+    }
+
+    if upsert:
+        # Skip unchanged objects: Storage reports the MD5 of the stored content as its ETag.
+        # The stored content type must match too, so re-running --upsert still repairs
+        # objects uploaded earlier with a wrong type.
+        try:
+            head = session.head(object_url, headers=auth_headers, timeout=timeout_s)
+        except requests.RequestException:
+            head = None
+        if head is not None and head.status_code == 200:
+            remote_etag = (head.headers.get("etag") or "").removeprefix("W/").strip('"')
+            remote_type = head.headers.get("content-type") or ""
+            if (
+                _normalize_content_type(remote_type) == _normalize_content_type(content_type)
+                and remote_etag
+                and remote_etag == _file_md5(file_path)
+            ):
+                return False
+
+    url = object_url
     if upsert:
         url += "?upsert=true"
 
+    size = file_path.stat().st_size
     headers = {
-        "apikey": token,
-        "Authorization": f"Bearer {token}",
+        **auth_headers,
         "content-type": content_type,
+        "content-length": str(size),
     }
 
-    with open(file_path, "rb") as f:
-        resp = requests.put(url, headers=headers, data=f, timeout=timeout_s)
+    if size < _MMAP_THRESHOLD_BYTES:
+        resp = session.put(url, headers=headers, data=file_path.read_bytes(), timeout=timeout_s)
+    else:
+        # A bare mmap looks file-like to urllib3 and would be read back in 16 KiB chunks;
+        # a memoryview is sent as a single buffer.
+        with open(file_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            with memoryview(mm) as view:
+                resp = session.put(url, headers=headers, data=view, timeout=timeout_s)
 
     if resp.status_code >= 400:
         raise RuntimeError(f"Upload failed: {object_key} ({resp.status_code}) {resp.text[:300]}")
 
+    return True
+
 
 def main():
     # Prefer loading `flask_server/.env` regardless of current working directory.
@@ -85,6 +143,7 @@ def main():
     )
     parser.add_argument("--upsert", action="store_true", help="Overwrite existing objects")
     parser.add_argument("--timeout", type=int, default=60, help="Request timeout seconds")
+    parser.add_argument("--workers", type=int, default=16, help="Parallel uploads")
     parser.add_argument("--dry-run", action="store_true", help="List what would be uploaded")
     args = parser.parse_args()
 
@@ -107,9 +166,16 @@ def main():
         raise SystemExit(f"Seed dir not found: {seed_path}")
 
     def _walk_files(base: Path):
-        for root, _, filenames in os.walk(base):
-            for name in filenames:
-                yield Path(root) / name
+        # Iterative os.scandir walk: DirEntry caches the type, so no extra stat per entry.
+        # Like os.walk, symlinked directories are not descended into.
+        stack = [str(base)]
+        while stack:
+            with os.scandir(stack.pop()) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif not entry.is_dir():
+                        yield Path(entry.path)
 
     # If supabase_seed/web exists, default to uploading its contents to bucket root
     # (so web/index.html becomes index.html), while still uploading root files like
@@ -161,6 +227,7 @@ def main():
     else:
         print("Mode:   preserve paths")
     print(f"Upsert: {args.upsert}")
+    print(f"Workers: {args.workers}")
     print(f"DryRun: {args.dry_run}")
 
     if args.dry_run:
@@ -170,19 +237,42 @@ def main():
             print(f"... (+{len(files) - 50} more)")
         return
 
-    for i, (object_key, file_path) in enumerate(files, start=1):
-        _put_object(
-            supabase_url=supabase_url,
-            bucket=args.bucket,
-            object_key=object_key,
-            file_path=file_path,
-            token=token,
-            upsert=args.upsert,
-            timeout_s=args.timeout,
-        )
-        if i == 1 or i % 25 == 0 or i == len(files):
-            print(f"Uploaded {i}/{len(files)}")
-
+    # Uploads are network-bound: run them on threads sharing one keep-alive connection pool.
+    workers = max(1, args.workers)
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=workers, pool_maxsize=workers)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(
+                _put_object,
+                session=session,
+                supabase_url=supabase_url,
+                bucket=args.bucket,
+                object_key=object_key,
+                file_path=file_path,
+                token=token,
+                upsert=args.upsert,
+                timeout_s=args.timeout,
+            )
+            for object_key, file_path in files
+        ]
+        skipped = 0
+        for i, future in enumerate(as_completed(futures), start=1):
+            try:
+                if not future.result():
+                    skipped += 1
+            except BaseException:
+                # On any failure (including Ctrl-C) drop queued uploads; in-flight ones finish
+                # before the error propagates.
+                executor.shutdown(wait=True, cancel_futures=True)
+                raise
+            if i == 1 or i % 25 == 0 or i == len(files):
+                print(f"Processed {i}/{len(files)}")
+
+    print(f"Uploaded {len(files) - skipped}, skipped {skipped} unchanged.")
     print("Done.")
 
 